@@ -1,168 +1,301 @@
 import argparse
+import asyncio
 import atexit
+import concurrent.futures
+import hashlib
+import hmac
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
 
-from flask import Flask, request, jsonify, render_template_string
+import orjson
+from flask import Flask, Response, request, jsonify
+from flask_compress import Compress
+from flask.json.provider import JSONProvider
 
-from constants import NEAR_TEXT_DISTANCE
-from utils import get_local_weaviate_client, get_cloud_weaviate_client
+from constants import (
+    INDEX_MAX_AGE,
+    NEAR_TEXT_AUTO_LIMIT,
+    NEAR_TEXT_DISTANCE,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SEARCH_MAX_AGE,
+    SEARCH_RETURN_PROPERTIES,
+    SEARCH_STALE_WHILE_REVALIDATE,
+    SEMANTIC_CACHE_TTL,
+    WARMUP_TIMEOUT,
+    WEAVIATE_KEEPALIVE_INTERVAL,
+)
+from semantic_cache import SemanticCache
+from utils import get_local_weaviate_async_client, get_cloud_weaviate_async_client, get_ollama_embeddings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _orjson_default(obj):
+    # Cached search results are read-only mappings
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """Serialize JSON with orjson instead of the pure-Python encoder."""
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.config["COMPRESS_MIMETYPES"] = ["text/html", "application/json"]
+app.config["COMPRESS_LEVEL"] = 6
+Compress(app)
 app.config["WEAVIATE_CLIENT_MODE"] = os.getenv("WEAVIATE_CLIENT_MODE", "local")
-app.weaviate_client = None
+app.config["ADMIN_TOKEN"] = os.getenv("ADMIN_TOKEN")
+app.weaviate_loop = None
+app.weaviate_async_client = None
+app.weaviate_keepalive = None
+app.semantic_cache = SemanticCache()
+
+# The search page is static, so it is read once and served as raw bytes
+with open(os.path.join(app.static_folder, "index.html"), "rb") as index_file:
+    _INDEX_BYTES = index_file.read()
+_INDEX_ETAG = hashlib.blake2b(_INDEX_BYTES, digest_size=8).hexdigest()
+
+_weaviate_loop_lock = threading.Lock()
+_weaviate_client_lock = threading.Lock()
+
+# Exact-match cache of (expires_at, results) per query, most recently used last
+_search_results = OrderedDict()
+_search_results_lock = threading.Lock()
+
+# Uncached searches currently running on the Weaviate loop, keyed by query
+_inflight_searches = {}
+_inflight_searches_lock = threading.Lock()
+
+
+def get_weaviate_loop():
+    """Return the event loop that owns the async Weaviate client.
+
+    Flask runs every async view in a fresh event loop, but the client's gRPC
+    channel and HTTP pool are bound to the loop they were opened on, so the
+    client lives on a long-running loop in a background thread instead.
+    """
+    with _weaviate_loop_lock:
+        if app.weaviate_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="weaviate-loop", daemon=True).start()
+            app.weaviate_loop = loop
+    return app.weaviate_loop
+
+
+async def run_on_weaviate_loop(coro):
+    """Await a coroutine on the Weaviate loop from any other event loop."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_weaviate_loop())
+    return await asyncio.wrap_future(future)
 
 
 def get_weaviate_client():
     """Select the configured Weaviate client."""
-    client = getattr(app, "weaviate_client", None)
+    client = getattr(app, "weaviate_async_client", None)
     if client is not None:
         return client
 
-    mode = app.config.get("WEAVIATE_CLIENT_MODE", "local")
-    app.weaviate_client = initialize_weaviate_client(mode)
-    return app.weaviate_client
+    with _weaviate_client_lock:
+        if app.weaviate_async_client is None:
+            mode = app.config.get("WEAVIATE_CLIENT_MODE", "local")
+            app.weaviate_async_client = initialize_weaviate_client(mode)
+    return app.weaviate_async_client
+
+
+def get_semantic_cache():
+    """Select the semantic cache; only the local mode has an Ollama embedder."""
+    if app.config.get("WEAVIATE_CLIENT_MODE", "local") != "local":
+        return None
+    return app.semantic_cache
+
+
+def client_has_etag(etag):
+    """Check If-None-Match, ignoring the content-encoding suffix Flask-Compress appends."""
+    if_none_match = request.if_none_match
+    return if_none_match.star_tag or any(
+        tag.split(":", 1)[0] == etag for tag in if_none_match.as_set(include_weak=True)
+    )
 
 
 @app.route('/')
 def index():
     """Main search page"""
-    html_template = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>MTG Semantic Search</title>
-        <style>
-            body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }
-            .search-box { width: 100%; padding: 10px; font-size: 16px; margin-bottom: 20px; }
-            .card { border: 1px solid #ddd; margin: 10px 0; padding: 15px; border-radius: 5px; display: flex; gap: 15px; align-items: flex-start; }
-            .card-image { flex-shrink: 0; width: 150px; }
-            .card-image img { width: 100%; border-radius: 4px; object-fit: cover; }
-            .card-content { flex: 1; }
-            .card-name { font-weight: bold; font-size: 18px; color: #333; }
-            .card-type { color: #666; margin: 5px 0; }
-            .card-text { margin: 10px 0; }
-            .mana-cost { color: #0066cc; font-weight: bold; }
-            .power-toughness { color: #cc6600; font-weight: bold; }
-            .loading { text-align: center; color: #666; }
-        </style>
-    </head>
-    <body>
-        <h1>MTG Card Semantic Search</h1>
-        <input type="text" id="searchInput" class="search-box" placeholder="Search for cards... (e.g., 'powerful red dragon', 'blue control spell')" />
-        <div id="results"></div>
-        
-        <script>
-            const searchInput = document.getElementById('searchInput');
-            const results = document.getElementById('results');
-            
-            let searchTimeout;
-            
-            searchInput.addEventListener('input', function() {
-                clearTimeout(searchTimeout);
-                const query = this.value.trim();
-                
-                if (query.length < 2) {
-                    results.innerHTML = '';
-                    return;
-                }
-                
-                searchTimeout = setTimeout(() => {
-                    searchCards(query);
-                }, 300);
-            });
-            
-            async function searchCards(query) {
-                results.innerHTML = '<div class="loading">Searching...</div>';
-                
-                try {
-                    const response = await fetch('/search', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({ query: query })
-                    });
-                    
-                    const data = await response.json();
-                    displayResults(data);
-                } catch (error) {
-                    results.innerHTML = '<div class="loading">Error searching cards</div>';
-                }
-            }
-            
-            function displayResults(cards) {
-                if (!cards || cards.length === 0) {
-                    results.innerHTML = '<div class="loading">No cards found</div>';
-                    return;
-                }
-                
-                const html = cards.map(card => `
-                    <div class="card">
-                        ${card.image_url ? `
-                            <div class="card-image">
-                                <img src="${card.image_url}" alt="${card.name || 'Card art'}" loading="lazy" onerror="this.parentElement.style.display='none';" />
-                            </div>
-                        ` : ''}
-                        <div class="card-content">
-                            <div class="card-name">${card.name || 'Unknown'}</div>
-                            <div class="card-type">${card.type || ''}</div>
-                            ${card.mana_cost ? `<div class="mana-cost">Cost: ${card.mana_cost}</div>` : ''}
-                            ${card.power && card.toughness ? `<div class="power-toughness">${card.power}/${card.toughness}</div>` : ''}
-                            ${card.text ? `<div class="card-text">${card.text}</div>` : ''}
-                            ${card.flavor ? `<div class="card-text" style="font-style: italic; color: #666;">${card.flavor}</div>` : ''}
-                        </div>
-                    </div>
-                `).join('');
-                
-                results.innerHTML = html;
-            }
-        </script>
-    </body>
-    </html>
-    """
-    return render_template_string(html_template)
+    if client_has_etag(_INDEX_ETAG):
+        response = Response(status=304)
+    else:
+        response = Response(_INDEX_BYTES, mimetype='text/html')
+    response.set_etag(_INDEX_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = INDEX_MAX_AGE
+    return response
 
-@app.route('/search', methods=['POST'])
-def search_cards():
+@app.route('/search', methods=['GET', 'POST'])
+async def search_cards():
     """Search for cards using semantic search"""
     try:
-        data = request.get_json()
-        query = data.get('query', '').strip()
+        if request.method == 'GET':
+            query = request.args.get('q', '').strip()
+        else:
+            data = request.get_json()
+            query = data.get('query', '').strip()
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        # Connect to Weaviate and search
-        client = get_weaviate_client()
-        cards = client.collections.use("Cards")
-        response = cards.query.near_text(
-            query=query,
-            limit=5,
-            distance=NEAR_TEXT_DISTANCE
-        )
-        
-        # Format results
-        results = []
-        for obj in response.objects:
-            card_data = obj.properties
-            results.append(card_data)
+        results = await _search_weaviate(query)
         
-        return jsonify(results)
+        # Bypass jsonify on the hot path; orjson writes the response bytes directly
+        body = orjson.dumps(results, default=_orjson_default, option=OrjsonProvider.option)
+        if request.method != 'GET':
+            return Response(body, mimetype='application/json')
+
+        # GET searches are cacheable by the browser and any CDN in front of the app
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        if client_has_etag(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag, weak=True)
+        response.cache_control.public = True
+        response.cache_control.max_age = SEARCH_MAX_AGE
+        response.cache_control.stale_while_revalidate = SEARCH_STALE_WHILE_REVALIDATE
+        return response
             
     except Exception as e:
         logger.error(f"Search error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+async def _search_weaviate(query: str) -> tuple[MappingProxyType, ...]:
+    """Search Weaviate, memoizing results per exact query string until they expire"""
+    with _search_results_lock:
+        entry = _search_results.get(query)
+        if entry is not None:
+            expires_at, results = entry
+            if expires_at > time.monotonic():
+                _search_results.move_to_end(query)
+                return results
+            del _search_results[query]
+
+    results, expires_at = await asyncio.wrap_future(_search_single_flight(query))
+
+    with _search_results_lock:
+        _search_results[query] = (expires_at, results)
+        if len(_search_results) > SEARCH_CACHE_SIZE:
+            _search_results.popitem(last=False)
+
+    return results
+
+
+def _search_single_flight(query: str) -> concurrent.futures.Future:
+    """Share one uncached search between all concurrent requests for the same query"""
+    client = get_weaviate_client()
+
+    with _inflight_searches_lock:
+        future = _inflight_searches.get(query)
+        if future is not None:
+            return future
+        future = asyncio.run_coroutine_threadsafe(
+            _search_uncached(client, query), get_weaviate_loop()
+        )
+        _inflight_searches[query] = future
+
+    # Registered outside the lock: a search that has already finished runs the
+    # callback immediately on this thread, and the callback takes the lock itself
+    future.add_done_callback(lambda done: _finish_inflight_search(query, done))
+    return future
+
+
+def _finish_inflight_search(query: str, future: concurrent.futures.Future):
+    with _inflight_searches_lock:
+        if _inflight_searches.get(query) is future:
+            del _inflight_searches[query]
+
+
+async def _search_uncached(client, query: str) -> tuple[tuple[MappingProxyType, ...], float]:
+    """Return the results and the time.monotonic() at which they should stop being served"""
+    # Serve paraphrases of recent queries from the semantic cache
+    cache = get_semantic_cache()
+    embedding = None
+    if cache is not None:
+        try:
+            results, embedding, expires_at = await asyncio.to_thread(cache.lookup, query)
+            if results is not None:
+                # Keep the semantic entry's expiry so the exact cache cannot extend it
+                return results, expires_at
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+
+    results = await _query_weaviate(client, query, embedding)
+    if embedding is not None:
+        cache.store(query, embedding, results, ttl=SEMANTIC_CACHE_TTL)
+    return results, time.monotonic() + SEARCH_CACHE_TTL
+
+
+async def _query_weaviate(client, query: str, embedding=None) -> tuple[MappingProxyType, ...]:
+    cards = client.collections.use("Cards")
+    options = {
+        "limit": 5,
+        "distance": NEAR_TEXT_DISTANCE,
+        "auto_limit": NEAR_TEXT_AUTO_LIMIT,
+        "return_properties": SEARCH_RETURN_PROPERTIES,
+        "return_metadata": None,
+    }
+    if embedding is not None:
+        # The semantic cache embedded the query with the same Ollama model as the
+        # collection's vectorizer, so reuse it rather than embedding the query twice.
+        # Cosine distance is unaffected by the cache's normalization.
+        response = await cards.query.near_vector(near_vector=embedding.tolist(), **options)
+    else:
+        response = await cards.query.near_text(query=query, **options)
+
+    # Format results as read-only mappings, since they are shared between requests
+    return tuple(MappingProxyType(obj.properties) for obj in response.objects)
+
+
+@app.route('/admin/cache/clear', methods=['POST'])
+def clear_search_caches():
+    """Drop cached search results, e.g. after rebuilding the Cards collection"""
+    token = app.config.get("ADMIN_TOKEN")
+    if not token:
+        return jsonify({'error': 'Admin endpoints are disabled'}), 403
+
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    with _search_results_lock:
+        _search_results.clear()
+    cache = get_semantic_cache()
+    if cache is not None:
+        cache.clear()
+
+    logger.info("Cleared search caches")
+    return jsonify({'status': 'cleared'})
+
 @app.route('/health')
-def health():
+async def health():
     """Health check endpoint"""
     try:
         client = get_weaviate_client()
+        if not await run_on_weaviate_loop(client.is_ready()):
+            raise RuntimeError("Weaviate is not ready")
         return jsonify({'status': 'healthy', 'weaviate': 'connected'})
     except Exception as e:
         logger.error(f"Health check error: {str(e)}", exc_info=True)
@@ -170,21 +303,63 @@ def health():
 
 def initialize_weaviate_client(mode: str):
     if mode == "cloud":
-        return get_cloud_weaviate_client()
-    if mode == "local":
-        return get_local_weaviate_client()
-    raise RuntimeError(f"Unsupported client mode: {mode}")
+        client = get_cloud_weaviate_async_client()
+    elif mode == "local":
+        client = get_local_weaviate_async_client()
+    else:
+        raise RuntimeError(f"Unsupported client mode: {mode}")
+
+    loop = get_weaviate_loop()
+    asyncio.run_coroutine_threadsafe(client.connect(), loop).result()
+    app.weaviate_keepalive = asyncio.run_coroutine_threadsafe(keep_weaviate_warm(client), loop)
+    return client
+
+
+async def keep_weaviate_warm(client):
+    """Ping Weaviate periodically so idle connections are not torn down between searches."""
+    while True:
+        await asyncio.sleep(WEAVIATE_KEEPALIVE_INTERVAL)
+        try:
+            if not await client.is_ready():
+                logger.warning("Weaviate keepalive: instance is not ready")
+        except Exception as exc:
+            logger.warning(f"Weaviate keepalive failed: {exc}")
+
+
+def warm_up():
+    """Connect to Weaviate and load the embedding model before the first search."""
+    start = time.perf_counter()
+    try:
+        client = get_weaviate_client()
+        future = asyncio.run_coroutine_threadsafe(_query_weaviate(client, "warmup"), get_weaviate_loop())
+        future.result(timeout=WARMUP_TIMEOUT)
+        logger.info(f"Warmed up Weaviate in {time.perf_counter() - start:.2f}s")
+    except Exception as exc:
+        logger.warning(f"Weaviate warmup failed: {exc}")
+
+    if get_semantic_cache() is not None:
+        start = time.perf_counter()
+        try:
+            get_ollama_embeddings(["warmup"], timeout=WARMUP_TIMEOUT)
+            logger.info(f"Warmed up Ollama embedding model in {time.perf_counter() - start:.2f}s")
+        except Exception as exc:
+            logger.warning(f"Ollama warmup failed: {exc}")
 
 
 def close_weaviate_client():
-    client = getattr(app, "weaviate_client", None)
+    keepalive = getattr(app, "weaviate_keepalive", None)
+    if keepalive is not None:
+        keepalive.cancel()
+        app.weaviate_keepalive = None
+
+    client = getattr(app, "weaviate_async_client", None)
     if client is not None:
         try:
-            client.close()
+            asyncio.run_coroutine_threadsafe(client.close(), get_weaviate_loop()).result()
         except Exception as exc:
             logger.warning(f"Failed to close Weaviate client cleanly: {exc}")
         finally:
-            app.weaviate_client = None
+            app.weaviate_async_client = None
 
 
 atexit.register(close_weaviate_client)
@@ -207,7 +382,8 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     app.config["WEAVIATE_CLIENT_MODE"] = args.client
-    app.weaviate_client = initialize_weaviate_client(args.client)
+    app.weaviate_async_client = initialize_weaviate_client(args.client)
+    warm_up()
 
     logger.info(f"Starting Flask app on port 5000 using {args.client} client (debug={args.debug})")
     app.run(host='0.0.0.0', port=5000, debug=args.debug)
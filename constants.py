@@ -1 +1,45 @@
-NEAR_TEXT_DISTANCE = 1.0
\ No newline at end of file
+NEAR_TEXT_DISTANCE = 0.55
+# Autocut: only return results up to the first jump in distance
+NEAR_TEXT_AUTO_LIMIT = 1
+
+# HNSW search/build beam widths for the Cards collection
+HNSW_EF = 64
+HNSW_EF_CONSTRUCTION = 128
+
+# Weaviate client timeouts (seconds) and how often the app pings its connection
+WEAVIATE_INIT_TIMEOUT = 5
+WEAVIATE_QUERY_TIMEOUT = 15
+WEAVIATE_KEEPALIVE_INTERVAL = 30
+
+# Upper bound (seconds) on startup warmup calls; a cold Ollama model load is slow
+WARMUP_TIMEOUT = 120
+
+SEARCH_CACHE_SIZE = 1024
+# Exact-match results expire after this many seconds, so stale results age out of
+# every gunicorn worker even though /admin/cache/clear only reaches one of them
+SEARCH_CACHE_TTL = 3600
+
+# Card properties rendered by the search page; everything else stays in Weaviate
+SEARCH_RETURN_PROPERTIES = [
+    "name",
+    "type",
+    "mana_cost",
+    "power",
+    "toughness",
+    "text",
+    "flavor",
+    "image_url",
+]
+
+# Browser cache lifetimes (seconds) for the search page and GET /search results
+INDEX_MAX_AGE = 3600
+SEARCH_MAX_AGE = 60
+SEARCH_STALE_WHILE_REVALIDATE = 300
+
+EMBEDDING_MODEL = "nomic-embed-text"
+
+# Semantic cache: queries whose embeddings are at least this cosine-similar to a
+# previously seen query reuse its results instead of hitting Weaviate.
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_TTL = 3600
+SEMANTIC_CACHE_MAX_ENTRIES = 2048
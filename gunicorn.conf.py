@@ -0,0 +1,21 @@
+import multiprocessing
+import os
+import threading
+
+bind = "0.0.0.0:5000"
+
+# Threaded workers: the Weaviate client runs its own asyncio loop in a background
+# thread, which does not mix with gevent's monkey-patching.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # Connect to Weaviate and load the embedding model in the background. Warmup can
+    # take up to 2 * WARMUP_TIMEOUT with a cold Ollama model, and running it inline
+    # would block the worker's heartbeat until the arbiter's timeout kills it.
+    from app import warm_up
+
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
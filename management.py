@@ -1,16 +1,38 @@
 import argparse
 import ast
+import functools
+import hashlib
+import inspect
+import itertools
 import json
+import logging
+import multiprocessing
 import os
+import queue
 import re
+import threading
+import time
 
-import pandas as pd
-
-from constants import NEAR_TEXT_DISTANCE
-from utils import get_local_weaviate_client, get_cloud_weaviate_client
+from constants import EMBEDDING_MODEL, HNSW_EF, HNSW_EF_CONSTRUCTION, NEAR_TEXT_DISTANCE
+from utils import close_weaviate_clients, get_ollama_embeddings, get_shared_weaviate_client
 from weaviate.classes.config import Configure, DataType, Property
 
+logger = logging.getLogger(__name__)
+
 CARDS_CSV_PATH = "data/all_mtg_cards.csv"
+CARDS_PARQUET_PATH = "data/all_mtg_cards.parquet"
+# Parquet schema metadata key holding the derivation_hash the file was written with
+PARQUET_DERIVATION_KEY = b"derivation_hash"
+CSV_CHUNKSIZE = 10_000
+PREPROCESS_CHUNKSIZE = 500
+READ_AHEAD_CHUNKS = 2
+# pyarrow parses the CSV in blocks of this many bytes across its thread pool
+CSV_BLOCK_SIZE = 8 << 20
+# weaviate-client's defaults for fixed-size batches
+FIXED_BATCH_SIZE = 100
+FIXED_BATCH_CONCURRENT_REQUESTS = 2
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_TIMEOUT = 300
 
 COLOUR_MAP = {
     "W": "white",
@@ -20,81 +42,92 @@ COLOUR_MAP = {
     "G": "green",
 }
 
+_MANA_RE = re.compile(r"\{([^}]*)\}")
 
-def expand_mana_cost(mana_cost):
-    if pd.isna(mana_cost) or not mana_cost:
-        return None
 
-    symbols = re.findall(r"\{([^}]*)\}", str(mana_cost))
-    if not symbols:
+# Mana costs repeat heavily across the card set, so expansions are memoized.
+# Callers pass strings or None; preprocess_card_row maps missing values to None.
+@functools.lru_cache(maxsize=4096)
+def expand_mana_cost(mana_cost):
+    if not mana_cost:
         return None
 
-    expanded_parts = []
-
-    for raw_symbol in symbols:
-        symbol = raw_symbol.strip().upper()
-        if not symbol:
-            continue
-
-        expanded = _expand_single_symbol(symbol)
-        if expanded:
-            expanded_parts.append(expanded)
-
+    expanded_parts = [
+        expanded
+        for match in _MANA_RE.finditer(mana_cost)
+        if (expanded := _expand_single_symbol(match.group(1).strip().upper()))
+    ]
     return ", ".join(expanded_parts) if expanded_parts else None
 
 
-def _expand_single_symbol(symbol):
-    if symbol.isdigit():
-        value = int(symbol)
-        return f"{value} colourless mana"
-
-    if symbol in COLOUR_MAP:
-        colour = COLOUR_MAP[symbol]
-        return f"1 {colour} mana"
-
-    if symbol == "C":
-        return "1 colourless mana"
+_SYMBOL_MAP = {
+    "C": "1 colourless mana",
+    "S": "1 snow mana",
+    "X": "X mana",
+    "T": "tap symbol",
+    "Q": "untap symbol",
+    **{symbol: f"1 {colour} mana" for symbol, colour in COLOUR_MAP.items()},
+}
 
-    if symbol == "S":
-        return "1 snow mana"
+_HYBRID_PART_MAP = {
+    "P": "2 life",
+    "C": "colourless",
+    "S": "snow",
+    **COLOUR_MAP,
+}
 
-    if symbol == "X":
-        return "X mana"
 
-    if symbol == "T":
-        return "tap symbol"
+@functools.lru_cache(maxsize=256)
+def _expand_single_symbol(symbol):
+    """Expand one stripped, upper-case mana symbol such as "2", "W" or "W/U"."""
+    expanded = _SYMBOL_MAP.get(symbol)
+    if expanded is not None:
+        return expanded
 
-    if symbol == "Q":
-        return "untap symbol"
+    if symbol.isdigit():
+        return f"{int(symbol)} colourless mana"
 
     if "/" in symbol:
-        hybrid_parts = [_describe_hybrid_part(part) for part in symbol.split("/")]
-        hybrid_parts = [part for part in hybrid_parts if part]
-        if hybrid_parts:
-            return f"{' or '.join(hybrid_parts)} hybrid mana"
+        expanded = _expand_hybrid_symbol(symbol)
+        if expanded:
+            return expanded
 
     return symbol
 
 
+def _expand_hybrid_symbol(symbol):
+    hybrid_parts = [_describe_hybrid_part(part) for part in symbol.split("/")]
+    hybrid_parts = [part for part in hybrid_parts if part]
+    if hybrid_parts:
+        return f"{' or '.join(hybrid_parts)} hybrid mana"
+    return None
+
+
 def _describe_hybrid_part(part):
-    part = part.upper().strip()
+    # Symbols are upper-cased once in expand_mana_cost; only the split can leave whitespace
+    part = part.strip()
+
+    described = _HYBRID_PART_MAP.get(part)
+    if described is not None:
+        return described
 
     if part.isdigit():
         return f"{int(part)} colourless"
 
-    if part == "P":
-        return "2 life"
-
-    if part in COLOUR_MAP:
-        return COLOUR_MAP[part]
-
-    if part == "C":
-        return "colourless"
+    return part
 
-    if part == "S":
-        return "snow"
 
-    return part
+# Expand every hybrid symbol printed on cards up front, so they resolve with the
+# same single lookup as plain symbols. Anything else still falls through to
+# _expand_hybrid_symbol.
+_COLOUR_PAIRS = list(itertools.permutations(COLOUR_MAP, 2))
+_HYBRID_SYMBOLS = [
+    *(f"{first}/{second}" for first, second in _COLOUR_PAIRS),  # "W/U"
+    *(f"{generic}/{colour}" for generic in ("2", "C") for colour in COLOUR_MAP),  # "2/W", "C/G"
+    *(f"{colour}/P" for colour in COLOUR_MAP),  # Phyrexian "R/P"
+    *(f"{first}/{second}/P" for first, second in _COLOUR_PAIRS),  # "W/U/P"
+]
+_SYMBOL_MAP.update((symbol, _expand_hybrid_symbol(symbol)) for symbol in _HYBRID_SYMBOLS)
 
 
 PROPERTIES = [
@@ -118,17 +151,56 @@ PROPERTIES = [
 ]
 
 
+HNSW_INDEX_CONFIG = Configure.VectorIndex.hnsw(ef=HNSW_EF, ef_construction=HNSW_EF_CONSTRUCTION)
+
+VECTORIZED_PROPERTIES = sorted(
+    (
+        prop for prop in PROPERTIES
+        if not prop.skip_vectorization and prop.dataType in (DataType.TEXT, DataType.TEXT_ARRAY)
+    ),
+    key=lambda prop: prop.name,
+)
+
+
+def card_vector_text(card):
+    """Approximate the text Weaviate's text2vec modules embed for a card.
+
+    That is the collection name followed by every vectorized text property, in
+    alphabetical order, each value prefixed with its property name.
+    """
+    parts = ["cards"]
+    for prop in VECTORIZED_PROPERTIES:
+        value = card.get(prop.name)
+        if not value:
+            continue
+        values = value if isinstance(value, list) else [value]
+        parts.extend(f"{prop.name} {item}" for item in values)
+    return " ".join(parts)
+
+
+def embed_cards(records):
+    """Embed cards with batched Ollama calls instead of one vectorizer call per object."""
+    texts = [card_vector_text(card) for card in records]
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        vectors.extend(
+            get_ollama_embeddings(texts[start:start + EMBEDDING_BATCH_SIZE], timeout=EMBEDDING_TIMEOUT)
+        )
+    return vectors
+
+
 def create_local_cards_collection(client, should_recreate=False):
 
     if client.collections.exists("Cards") and should_recreate:
         client.collections.delete("Cards")
 
-    client.collections.create(
+    return client.collections.create(
         name="Cards",
         properties=PROPERTIES,
         vector_config=Configure.Vectors.text2vec_ollama(
             api_endpoint="http://host.docker.internal:11434",
-            model="nomic-embed-text",
+            model=EMBEDDING_MODEL,
+            vector_index_config=HNSW_INDEX_CONFIG,
         ),
     )
 
@@ -138,78 +210,371 @@ def create_cloud_cards_collection(client, should_recreate=False):
     if client.collections.exists("Cards") and should_recreate:
         client.collections.delete("Cards")
 
-    client.collections.create(
+    return client.collections.create(
         name="Cards",
         properties=PROPERTIES,
         vector_config=[
             Configure.Vectors.text2vec_weaviate(
                 name="title_vector",
                 source_properties=["title"],
-                model="Snowflake/snowflake-arctic-embed-l-v2.0"
+                model="Snowflake/snowflake-arctic-embed-l-v2.0",
+                vector_index_config=HNSW_INDEX_CONFIG,
             )
         ],
     )
 
 
-def add_cards_to_collection(client, num_cards=None):
-    cards = client.collections.use("Cards")
+def open_batch(collection, batch_size=None, concurrent_requests=None):
+    """Open a dynamic batch, or a fixed-size one when either setting is given."""
+    if batch_size is None and concurrent_requests is None:
+        # Dynamic batching sizes requests from server feedback and sends them concurrently
+        return collection.batch.dynamic()
+    return collection.batch.fixed_size(
+        batch_size=batch_size or FIXED_BATCH_SIZE,
+        concurrent_requests=concurrent_requests or FIXED_BATCH_CONCURRENT_REQUESTS,
+    )
 
-    with cards.batch.fixed_size(batch_size=200) as batch:
-        with pd.read_csv(CARDS_CSV_PATH, chunksize=200) as reader:
-            for chunk in reader:
-                for index, row in chunk.iterrows():
-                    print(f"Processing row {index}")
-                    row_dict = preprocess_card_row(row)
-                    if row_dict:
-                        batch.add_object(row_dict)
 
-                    if num_cards and index > num_cards:
-                        return
+def add_cards_to_collection(
+    collection,
+    cards,
+    precompute_vectors=False,
+    batch_size=None,
+    concurrent_requests=None,
+    chunksize=CSV_CHUNKSIZE,
+):
+    added = 0
+    ingest_started = time.perf_counter()
+
+    with open_batch(collection, batch_size, concurrent_requests) as batch:
+        # Reading and preprocessing the next chunks overlaps with uploading this one
+        for chunk in read_ahead(itertools.batched(cards, chunksize)):
+            started = time.perf_counter()
+
+            # Precomputed vectors bypass the collection's vectorizer; it is
+            # still configured so that near_text queries can embed the query.
+            vectors = embed_cards(chunk) if precompute_vectors else [None] * len(chunk)
+            for card, vector in zip(chunk, vectors):
+                batch.add_object(properties=card, vector=vector)
+
+            added += len(chunk)
+            # add_object blocks while the batcher's queue is full, so this tracks upload throughput
+            rate = len(chunk) / (time.perf_counter() - started)
+            logger.info(f"Processed {added} cards ({rate:.0f} cards/s)")
+
+    # Includes flushing the batches still queued when the loop ended
+    elapsed = time.perf_counter() - ingest_started
+    logger.info(f"Sent {added} cards in {elapsed:.1f}s ({added / elapsed:.0f} cards/s overall)")
+    failed_objects = collection.batch.failed_objects
+    if failed_objects:
+        logger.error(f"Failed to add {len(failed_objects)} of {added} cards, first error: {failed_objects[0].message}")
+
+    # Rows preprocessed in this process went through the memoized expansion
+    cache_info = expand_mana_cost.cache_info()
+    if cache_info.hits or cache_info.misses:
+        logger.info(f"Expanded {cache_info.misses} distinct mana costs with {cache_info.hits} cache hits")
+    return added
+
+
+def read_ahead(items, maxsize=READ_AHEAD_CHUNKS):
+    """Iterate items produced by a background thread, buffering up to maxsize of them."""
+    buffer = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item, error=None):
+        # Give up once the consumer has stopped instead of blocking forever on a full queue
+        while not stopped.is_set():
+            try:
+                buffer.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as error:
+            put(None, error)
+        else:
+            put(done)
+
+    threading.Thread(target=produce, name="card-reader", daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def add_cards_in_parallel(client_mode, workers, num_cards=None, **ingest_options):
+    """Ingest every workers-th card in each of several processes."""
+    shards = [(client_mode, shard, workers, num_cards, ingest_options) for shard in range(workers)]
+    # Spawn rather than fork: the parent already runs gRPC threads
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=workers, initializer=configure_logging) as pool:
+        added = sum(pool.map(_ingest_shard, shards))
+
+    logger.info(f"Added {added} cards from {workers} workers")
+    return added
 
 
-def query_cards(client, query):
-    cards = client.collections.use("Cards")
-    response = cards.query.near_text(
+def _ingest_shard(shard):
+    # Weaviate clients cannot be shared across processes, so each worker opens
+    # its own and streams the card file, preprocessing only the rows in its shard
+    client_mode, shard_index, workers, num_cards, ingest_options = shard
+    cards = load_cards(num_cards, shard_index=shard_index, shard_count=workers)
+    client = get_shared_weaviate_client(client_mode)
+    try:
+        return add_cards_to_collection(client.collections.use("Cards"), cards, **ingest_options)
+    finally:
+        close_weaviate_clients()
+
+
+def query_cards(collection, query, *, limit=3, distance=NEAR_TEXT_DISTANCE):
+    response = collection.query.near_text(
         query=query,
-        limit=3,
-        distance=NEAR_TEXT_DISTANCE
+        limit=limit,
+        distance=distance
     )
     return response
 
 
+CSV_COLUMNS = ["multiverse_id"] + [prop.name for prop in PROPERTIES if prop.name != "mana_cost_text_expanded"]
+LIST_COLUMNS = ["colors", "color_identity", "subtypes"]
+INT_COLUMNS = ["number", "power", "toughness"]
+
+
+def _present(value):
+    """False for None, NaN and the empty string csv reads for a missing value."""
+    return value == value and value not in ("", None)
+
+
+def _parse_list(value):
+    """Parse a Python-style list of strings such as "['W', 'U']"."""
+    if not _present(value):
+        return None
+    # Python's repr of plain strings, e.g. "['W', 'U']", splits without a parser.
+    # A leftover quote in any piece means another separator (e.g. "['W','U']"), so parse it.
+    if value.startswith("['") and value.endswith("']") and '"' not in value and "\\" not in value:
+        items = value[2:-2].split("', '")
+        if not any("'" in item for item in items):
+            return items
+    try:
+        return json.loads(value.replace("'", '"'))
+    except json.JSONDecodeError:
+        # Entries containing an apostrophe (e.g. "Urza's") are double-quoted
+        return ast.literal_eval(value)
+
+
+def read_card_rows():
+    """Stream the raw cards CSV one row at a time, skipping rows without a multiverse_id."""
+    # pyarrow is imported here rather than at the top so --query starts faster
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    # Every column is read as a string, so a value like "*" deep in the file cannot
+    # break types inferred from the first block; INT_COLUMNS are cast per batch below
+    reader = pacsv.open_csv(
+        CARDS_CSV_PATH,
+        read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=CSV_COLUMNS,
+            column_types=dict.fromkeys(CSV_COLUMNS, pa.string()),
+        ),
+    )
+    with reader:
+        for record_batch in reader:
+            record_batch = _cast_int_columns(record_batch)
+            # Dropped before any derived fields are built or rows are sent to a preprocessing pool
+            yield from (row for row in record_batch.to_pylist() if row["multiverse_id"])
+
+
+def _cast_int_columns(record_batch):
+    """Cast INT_COLUMNS to int64 for a whole record batch, with null for non-numeric stats like "*"."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for column in INT_COLUMNS:
+        index = record_batch.schema.get_field_index(column)
+        values = pc.utf8_trim_whitespace(record_batch.column(index))
+        values = pc.replace_substring_regex(values, r"^\+", "")
+        # At most 18 digits always fits in an int64
+        is_int = pc.match_substring_regex(values, r"^-?[0-9]{1,18}$")
+        values = pc.if_else(is_int, values, pa.scalar(None, pa.string()))
+        record_batch = record_batch.set_column(index, column, pc.cast(values, pa.int64()))
+    return record_batch
+
+
 def preprocess_card_row(row):
-    if pd.isna(row["multiverse_id"]):
+    """Derive the Weaviate properties from a raw CSV row, or None if it has no multiverse_id."""
+    if not _present(row["multiverse_id"]):
         return None
-    # print(row)
+
+    # Weaviate expects None rather than an empty string for missing values
     return {
-        "name": row["name"],
-        "mana_cost": row["mana_cost"],
-        "mana_cost_text_expanded": expand_mana_cost(row["mana_cost"]),
-        "colors": ast.literal_eval(row["colors"]) if pd.notna(row["colors"]) else None,
-        "color_identity": ast.literal_eval(row["color_identity"]) if pd.notna(row["color_identity"]) else None,
-        "type": row["type"],
-        "subtypes": ast.literal_eval(row["subtypes"]) if pd.notna(row["subtypes"]) else None,
-        "rarity": row["rarity"],
-        "text": row["text"],
-        "flavor": row["flavor"] if pd.notna(row["flavor"]) else None,
-        "number": int(row["number"]) if pd.notna(row["number"]) else None,
-        "power": int(row["power"]) if pd.notna(row["power"]) else None,
-        "toughness": int(row["toughness"]) if pd.notna(row["toughness"]) else None,
-        "loyalty": str(row["loyalty"]) if pd.notna(row["loyalty"]) else None,
-        "legalities": row["legalities"],
-        "image_url": row["image_url"],
+        "name": row["name"] or None,
+        "mana_cost": row["mana_cost"] or None,
+        "mana_cost_text_expanded": expand_mana_cost(row["mana_cost"] or None),
+        "colors": _parse_list(row["colors"]),
+        "color_identity": _parse_list(row["color_identity"]),
+        "type": row["type"] or None,
+        "subtypes": _parse_list(row["subtypes"]),
+        "rarity": row["rarity"] or None,
+        "text": row["text"] or None,
+        "flavor": row["flavor"] or None,
+        # INT_COLUMNS were cast to ints or None per record batch in read_card_rows
+        "number": row["number"],
+        "power": row["power"],
+        "toughness": row["toughness"],
+        "loyalty": row["loyalty"] or None,
+        "legalities": row["legalities"] or None,
+        "image_url": row["image_url"] or None,
     }
 
 
+def read_parquet_cards():
+    """Stream precomputed cards from the parquet file one record batch at a time."""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(CARDS_PARQUET_PATH)
+    for record_batch in parquet_file.iter_batches(columns=[prop.name for prop in PROPERTIES]):
+        yield from record_batch.to_pylist()
+
+
+def preprocess_in_pool(rows, processes):
+    """Preprocess raw CSV rows across a process pool, in completion order."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=processes) as pool:
+        yield from pool.imap_unordered(preprocess_card_row, rows, chunksize=PREPROCESS_CHUNKSIZE)
+
+
+def derivation_hash():
+    """Hash the code and tables that derive card fields from raw CSV rows."""
+    digest = hashlib.blake2b(digest_size=8)
+    for function in (
+        read_card_rows,
+        _cast_int_columns,
+        preprocess_card_row,
+        _present,
+        _parse_list,
+        expand_mana_cost,
+        _expand_single_symbol,
+        _expand_hybrid_symbol,
+        _describe_hybrid_part,
+    ):
+        digest.update(inspect.getsource(function).encode())
+    digest.update(repr([_MANA_RE.pattern, sorted(_SYMBOL_MAP.items()), sorted(_HYBRID_PART_MAP.items())]).encode())
+    return digest.hexdigest().encode()
+
+
+def precomputed_cards_are_current():
+    """True if the parquet file is newer than the CSV and was derived by the current code."""
+    import pyarrow.parquet as pq
+
+    if not os.path.exists(CARDS_PARQUET_PATH):
+        return False
+    if os.path.exists(CARDS_CSV_PATH) and os.path.getmtime(CARDS_PARQUET_PATH) < os.path.getmtime(CARDS_CSV_PATH):
+        return False
+
+    metadata = pq.read_schema(CARDS_PARQUET_PATH).metadata or {}
+    if metadata.get(PARQUET_DERIVATION_KEY) != derivation_hash():
+        logger.warning(
+            f"Ignoring {CARDS_PARQUET_PATH}: it was derived by different preprocessing code; rerun precompute.py"
+        )
+        return False
+    return True
+
+
+def load_cards(num_cards=None, processes=1, shard_index=0, shard_count=1):
+    """Stream the cards to ingest, preferring the precomputed parquet file when it is current.
+
+    Only every shard_count-th row from shard_index is kept, and rows are sharded
+    before preprocessing so that each --workers process only parses its own cards.
+    """
+    precomputed = precomputed_cards_are_current()
+    if precomputed:
+        logger.info(f"Loading precomputed cards from {CARDS_PARQUET_PATH}")
+        rows = read_parquet_cards()
+    else:
+        rows = read_card_rows()
+
+    # num_cards counts rows across all shards, so the total is the same for any --workers
+    rows = itertools.islice(itertools.islice(rows, num_cards), shard_index, None, shard_count)
+
+    if precomputed:
+        return rows
+    if processes > 1:
+        return filter(None, preprocess_in_pool(rows, processes))
+    return filter(None, map(preprocess_card_row, rows))
+
+
+def configure_logging():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
 def main():
+    configure_logging()
+
     parser = argparse.ArgumentParser(description="MTG semantic search management tools")
     parser.add_argument("--query", type=str, help="Run a semantic search with the given query text")
+    parser.add_argument("--limit", type=int, default=3, help="Maximum number of cards --query returns")
+    parser.add_argument(
+        "--distance",
+        type=float,
+        default=NEAR_TEXT_DISTANCE,
+        help="Maximum vector distance of cards --query returns",
+    )
     parser.add_argument(
         "--build-db",
         action="store_true",
         help="Rebuild the card collection in Weaviate using local card data",
     )
     parser.add_argument("--num-cards", type=int, help="Number of cards to add to the collection", default=None)
+    parser.add_argument(
+        "--precompute-vectors",
+        action="store_true",
+        help="Embed cards with batched Ollama calls during --build-db instead of Weaviate's per-object vectorizer (local client only)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to ingest cards with during --build-db",
+    )
+    parser.add_argument(
+        "--preprocess-workers",
+        type=int,
+        default=1,
+        help="Number of processes to preprocess CSV rows with while a single process uploads them",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Send fixed-size batches of this many cards instead of using Weaviate's dynamic batching",
+    )
+    parser.add_argument(
+        "--concurrent-requests",
+        type=int,
+        default=None,
+        help="Keep this many batch requests in flight per worker instead of using Weaviate's dynamic batching",
+    )
+    parser.add_argument(
+        "--csv-chunksize",
+        type=int,
+        default=CSV_CHUNKSIZE,
+        help="Number of cards read and vectorized at a time; throughput is logged per chunk",
+    )
     parser.add_argument(
         "--client",
         choices=["local", "cloud"],
@@ -221,29 +586,49 @@ def main():
 
     if not args.build_db and not args.query:
         parser.error("at least one of --build-db or --query must be provided")
-
-    client = None
+    if args.precompute_vectors and args.client != "local":
+        parser.error("--precompute-vectors requires the local client, whose collection is vectorized with Ollama")
+    if args.limit < 1:
+        parser.error("--limit must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.preprocess_workers < 1:
+        parser.error("--preprocess-workers must be at least 1")
+    if args.workers > 1 and args.preprocess_workers > 1:
+        parser.error("--preprocess-workers cannot be combined with --workers, whose processes preprocess their own shards")
+    for option in ("batch_size", "concurrent_requests", "csv_chunksize"):
+        value = getattr(args, option)
+        if value is not None and value < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
 
     try:
-        if args.client == "local":
-            client = get_local_weaviate_client()
-        else:
-            client = get_cloud_weaviate_client()
+        client = get_shared_weaviate_client(args.client)
 
         if args.build_db:
             if args.client == "local":
-                create_local_cards_collection(client, should_recreate=True)
+                collection = create_local_cards_collection(client, should_recreate=True)
+            else:
+                collection = create_cloud_cards_collection(client, should_recreate=True)
+            ingest_options = {
+                "precompute_vectors": args.precompute_vectors,
+                "batch_size": args.batch_size,
+                "concurrent_requests": args.concurrent_requests,
+                "chunksize": args.csv_chunksize,
+            }
+            if args.workers > 1:
+                add_cards_in_parallel(args.client, args.workers, num_cards=args.num_cards, **ingest_options)
             else:
-                create_cloud_cards_collection(client, should_recreate=True)
-            add_cards_to_collection(client, num_cards=args.num_cards)
+                cards = load_cards(num_cards=args.num_cards, processes=args.preprocess_workers)
+                add_cards_to_collection(collection, cards, **ingest_options)
+        else:
+            collection = client.collections.use("Cards")
 
         if args.query:
-            response = query_cards(client, args.query)
+            response = query_cards(collection, args.query, limit=args.limit, distance=args.distance)
             for obj in response.objects:
                 print(json.dumps(obj.properties, indent=2))
     finally:
-        if client is not None:
-            client.close()
+        close_weaviate_clients()
 
 
 if __name__ == "__main__":
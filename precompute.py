@@ -0,0 +1,30 @@
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from management import (
+    CARDS_PARQUET_PATH,
+    PARQUET_DERIVATION_KEY,
+    configure_logging,
+    derivation_hash,
+    preprocess_card_row,
+    read_card_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Expand mana costs and parse list columns once, so --build-db can ingest the result directly."""
+    configure_logging()
+
+    cards = pa.Table.from_pylist([card for card in map(preprocess_card_row, read_card_rows()) if card])
+    # load_cards ignores the file once the preprocessing code no longer matches this hash
+    cards = cards.replace_schema_metadata({PARQUET_DERIVATION_KEY: derivation_hash()})
+    pq.write_table(cards, CARDS_PARQUET_PATH)
+    logger.info(f"Wrote {cards.num_rows} cards to {CARDS_PARQUET_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import numpy as np
+
+from constants import SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL
+from utils import get_ollama_embeddings
+
+
+class SemanticCache:
+    """In-process cache of search results keyed by query embedding.
+
+    A lookup embeds the query and compares it against every cached query
+    embedding with a single matrix product; the closest entry is a hit when its
+    cosine similarity reaches the threshold and it has not expired.
+
+    Entries live in a preallocated ring buffer of max_entries rows, so storing
+    one writes a single row in place and, once full, overwrites the oldest.
+    """
+
+    def __init__(
+        self,
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        ttl=SEMANTIC_CACHE_TTL,
+        max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Allocated on the first store, once the embedding size is known
+        self._embeddings = None
+        self._expires_at = np.zeros(max_entries)
+        self._entries = [None] * max_entries
+        self._size = 0
+        self._next = 0
+
+    def embed(self, query):
+        embedding = np.asarray(get_ollama_embeddings([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def lookup(self, query):
+        """Return (results, embedding, expires_at); results and expires_at are None on a miss."""
+        embedding = self.embed(query)
+
+        with self._lock:
+            if not self._size:
+                return None, embedding, None
+
+            scores = np.dot(self._embeddings[:self._size], embedding)
+            scores[self._expires_at[:self._size] <= time.monotonic()] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None, embedding, None
+
+            return self._entries[best][1], embedding, float(self._expires_at[best])
+
+    def store(self, query, embedding, results, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+
+            slot = self._next
+            self._embeddings[slot] = embedding
+            self._expires_at[slot] = expires_at
+            self._entries[slot] = (query, results)
+            self._next = (slot + 1) % self.max_entries
+            self._size = max(self._size, slot + 1)
+
+    def clear(self):
+        with self._lock:
+            self._expires_at[:] = 0
+            self._entries = [None] * self.max_entries
+            self._size = 0
+            self._next = 0
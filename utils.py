@@ -1,5 +1,12 @@
+import atexit
 import os
+import threading
+
+import requests
 import weaviate
+from weaviate.classes.init import AdditionalConfig, Timeout
+
+from constants import EMBEDDING_MODEL, WEAVIATE_INIT_TIMEOUT, WEAVIATE_QUERY_TIMEOUT
 
 # Weaviate connection
 WEAVIATE_HOST = os.getenv('WEAVIATE_HOST', 'weaviate')
@@ -8,6 +15,14 @@ WEAVIATE_PORT = os.getenv('WEAVIATE_PORT', 8080)
 WEAVIATE_CLOUD_URL = os.getenv('WEAVIATE_CLOUD_URL')
 WEAVIATE_CLOUD_API_KEY = os.getenv('WEAVIATE_CLOUD_API_KEY')
 
+# Ollama connection (same embedder the local Weaviate vectorizer uses)
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', 5))
+
+WEAVIATE_ADDITIONAL_CONFIG = AdditionalConfig(
+    timeout=Timeout(init=WEAVIATE_INIT_TIMEOUT, query=WEAVIATE_QUERY_TIMEOUT),
+)
+
 def get_local_weaviate_client():
     """Get Weaviate client connection"""
     if not WEAVIATE_HOST or not WEAVIATE_PORT:
@@ -15,7 +30,11 @@ def get_local_weaviate_client():
             "WEAVIATE_HOST and WEAVIATE_PORT must be set to use the local client"
         )
     
-    return weaviate.connect_to_local(host=WEAVIATE_HOST, port=WEAVIATE_PORT)
+    return weaviate.connect_to_local(
+        host=WEAVIATE_HOST,
+        port=WEAVIATE_PORT,
+        additional_config=WEAVIATE_ADDITIONAL_CONFIG,
+    )
 
 def get_cloud_weaviate_client():
     """Get Weaviate client connection"""
@@ -25,6 +44,67 @@ def get_cloud_weaviate_client():
         )
     
     return weaviate.connect_to_weaviate_cloud(
-        cluster_url=WEAVIATE_CLOUD_URL, 
+        cluster_url=WEAVIATE_CLOUD_URL,
         auth_credentials=WEAVIATE_CLOUD_API_KEY,
-    )
\ No newline at end of file
+        additional_config=WEAVIATE_ADDITIONAL_CONFIG,
+    )
+
+# Shared sync clients, keyed by client mode, so repeated callers reuse one connection
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+def get_shared_weaviate_client(mode):
+    """Get the process-wide Weaviate client for "local" or "cloud", connecting on first use"""
+    with _shared_clients_lock:
+        client = _shared_clients.get(mode)
+        if client is None:
+            client = get_local_weaviate_client() if mode == "local" else get_cloud_weaviate_client()
+            _shared_clients[mode] = client
+        return client
+
+def close_weaviate_clients():
+    """Close every shared Weaviate client; the next get_shared_weaviate_client reconnects"""
+    with _shared_clients_lock:
+        clients = list(_shared_clients.values())
+        _shared_clients.clear()
+
+    for client in clients:
+        client.close()
+
+atexit.register(close_weaviate_clients)
+
+def get_local_weaviate_async_client():
+    """Get an unconnected async Weaviate client for the local instance"""
+    if not WEAVIATE_HOST or not WEAVIATE_PORT:
+        raise RuntimeError(
+            "WEAVIATE_HOST and WEAVIATE_PORT must be set to use the local client"
+        )
+
+    return weaviate.use_async_with_local(
+        host=WEAVIATE_HOST,
+        port=WEAVIATE_PORT,
+        additional_config=WEAVIATE_ADDITIONAL_CONFIG,
+    )
+
+def get_cloud_weaviate_async_client():
+    """Get an unconnected async Weaviate client for the cloud instance"""
+    if not WEAVIATE_CLOUD_URL or not WEAVIATE_CLOUD_API_KEY:
+        raise RuntimeError(
+            "WEAVIATE_CLOUD_URL and WEAVIATE_CLOUD_API_KEY must be set to use the cloud client"
+        )
+
+    return weaviate.use_async_with_weaviate_cloud(
+        cluster_url=WEAVIATE_CLOUD_URL,
+        auth_credentials=WEAVIATE_CLOUD_API_KEY,
+        additional_config=WEAVIATE_ADDITIONAL_CONFIG,
+    )
+
+def get_ollama_embeddings(texts, timeout=OLLAMA_TIMEOUT):
+    """Embed a list of texts with the Ollama embedding model"""
+    response = requests.post(
+        f"{OLLAMA_URL}/api/embed",
+        json={"model": EMBEDDING_MODEL, "input": texts},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()["embeddings"]